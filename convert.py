@@ -0,0 +1,596 @@
+"""MotionLogger-to-Condor conversion pipeline.
+
+Everything performance-sensitive lives here so any front-end (the Tkinter
+one in RoughDraft.py, or a script calling convert() directly) shares the
+same implementation.
+"""
+
+from __future__ import annotations
+
+import mmap
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+
+DELIM = ";"
+DATETIME_COL = "DATE/TIME"
+DT_FORMAT = "%d/%m/%Y %H:%M:%S"
+CHUNK_ROWS = 500_000  # rows parsed and aggregated per streaming chunk (pandas reader)
+ARROW_BLOCK_BYTES = 1 << 22  # bytes per read block when pyarrow does the parsing
+OUTPUT_COLUMNS = [
+    "DATE/TIME",
+    "EVENT",
+    "EXT TEMPERATURE",
+    "PIM",
+    "PIMn",
+    "ZCM",
+    "ZCMn",
+    "LIGHT",
+    "STATE",
+]
+
+# Per-column output formatting (upper-cased): None means render as an
+# integer, a number means trim floats to at most that many decimals.
+COLUMN_DECIMALS = {
+    "EVENT": None,
+    "ZCM": None,
+    "STATE": None,
+    "PIM": 6,
+    "PIMN": 15,
+    # NEW computed ZCMn: ZCM / epoch_seconds.
+    # Up to 3 decimals (trimmed) so 20.000 -> "20".
+    "ZCMN": 3,
+    "EXT TEMPERATURE": 9,
+    "LIGHT": 6,
+}
+
+# Known numeric columns (upper-cased) and their parse dtypes.
+# Anything not listed here is left as str, which is fine because the
+# aggregation rules only name known columns.
+NUMERIC_DTYPES = {
+    "EVENT": "float64",
+    "EXT TEMPERATURE": "float64",
+    "PIM": "float64",
+    "PIMN": "float64",
+    "ZCM": "float64",
+    "ZCMN": "float64",
+    "LIGHT": "float64",
+    "STATE": "float64",
+}
+
+
+if njit is not None:
+
+    @njit(cache=True, boundscheck=False)
+    def _bin_scan_kernel(bin_pos, values, state_codes, n_bins, n_states):
+        """Accumulate every per-bin aggregate in a single pass over the rows.
+
+        bin_pos is non-decreasing (rows are time-sorted), so one walk fills
+        per-bin column sums/counts and the per-bin state histogram together
+        instead of one bincount pass per column. state_codes uses -1 for
+        missing.
+        """
+        n_rows, n_cols = values.shape
+        sums = np.zeros((n_bins, n_cols), dtype=np.float64)
+        cnts = np.zeros((n_bins, n_cols), dtype=np.int64)
+        state_counts = np.zeros((n_bins, n_states), dtype=np.int32)
+        for i in range(n_rows):
+            b = bin_pos[i]
+            for j in range(n_cols):
+                v = values[i, j]
+                if not np.isnan(v):
+                    sums[b, j] += v
+                    cnts[b, j] += 1
+            s = state_codes[i]
+            if s >= 0:
+                state_counts[b, s] += 1
+        return sums, cnts, state_counts
+
+else:
+    _bin_scan_kernel = None
+
+
+def iter_data_chunks(in_path: Path, header_idx: int, dtype_map: dict):
+    """Yield the data table as a sequence of DataFrame chunks.
+
+    Prefers pyarrow's multi-threaded streaming CSV reader, which parses at
+    close to disk bandwidth and types the columns during the parse; when
+    pyarrow is missing (or cannot open the file) the chunked pandas C
+    reader is used instead.
+    """
+    if pa_csv is not None:
+        column_types = {
+            col: pa.float64() if dtype == "float64" else pa.string()
+            for col, dtype in dtype_map.items()
+        }
+        try:
+            reader = pa_csv.open_csv(
+                in_path,
+                read_options=pa_csv.ReadOptions(
+                    skip_rows=header_idx, block_size=ARROW_BLOCK_BYTES
+                ),
+                parse_options=pa_csv.ParseOptions(delimiter=DELIM),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types=column_types, null_values=[""]
+                ),
+            )
+        except pa.ArrowInvalid:
+            pass  # e.g. undecodable bytes; the pandas reader replaces them
+        else:
+            with reader:
+                for batch in reader:
+                    yield batch.to_pandas()
+            return
+
+    reader = pd.read_csv(
+        in_path,
+        sep=DELIM,
+        engine="c",
+        skiprows=header_idx,
+        dtype=dtype_map,
+        encoding="utf-8",
+        encoding_errors="replace",
+        chunksize=CHUNK_ROWS,
+    )
+    with reader:
+        yield from reader
+
+
+# Digit positions within "dd/mm/yyyy HH:MM:SS" and regular month lengths.
+_DT_DIGIT_POS = np.array([0, 1, 3, 4, 6, 7, 8, 9, 11, 12, 14, 15, 17, 18])
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _parse_datetime_fixed(strs: np.ndarray) -> np.ndarray | None:
+    """Parse dd/mm/yyyy HH:MM:SS strings by pure byte arithmetic.
+
+    Views the fixed-width strings as a digit matrix and converts the whole
+    column to epoch nanoseconds with vectorized int64 math (days-from-civil
+    for the date part) - no per-element strptime at all. Rows that are
+    digit-valid but not a real calendar date become NaT; returns None when
+    the column doesn't match the fixed layout at all.
+    """
+    try:
+        s = strs.astype("S")
+    except (UnicodeEncodeError, ValueError):
+        return None
+    if s.dtype.itemsize != 19:
+        return None
+    mat = s.view(np.uint8).reshape(len(s), 19)
+    layout_ok = (
+        (mat[:, 2] == ord("/"))
+        & (mat[:, 5] == ord("/"))
+        & (mat[:, 10] == ord(" "))
+        & (mat[:, 13] == ord(":"))
+        & (mat[:, 16] == ord(":"))
+    )
+    digits = mat[:, _DT_DIGIT_POS].astype(np.int64) - ord("0")
+    if not (layout_ok.all() and ((digits >= 0) & (digits <= 9)).all()):
+        return None
+
+    day = digits[:, 0] * 10 + digits[:, 1]
+    month = digits[:, 2] * 10 + digits[:, 3]
+    year = digits[:, 4] * 1000 + digits[:, 5] * 100 + digits[:, 6] * 10 + digits[:, 7]
+    hour = digits[:, 8] * 10 + digits[:, 9]
+    minute = digits[:, 10] * 10 + digits[:, 11]
+    second = digits[:, 12] * 10 + digits[:, 13]
+
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = _DAYS_IN_MONTH[np.clip(month, 0, 12)] + (leap & (month == 2))
+    valid = (
+        (month >= 1) & (month <= 12)
+        & (day >= 1) & (day <= month_days)
+        & (hour <= 23) & (minute <= 59) & (second <= 60)  # 60 = leap second
+    )
+
+    # Days since the Unix epoch (Howard Hinnant's days-from-civil, with
+    # numpy's floor division doing the negative-year handling for free).
+    y = year - (month <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    days = era * 146097 + doe - 719468
+
+    ns = (((days * 86400) + hour * 3600 + minute * 60 + second) * 1_000_000_000).view(
+        "datetime64[ns]"
+    )
+    ns[~valid] = np.datetime64("NaT")
+    return ns
+
+
+def parse_datetime_col(values: pd.Series) -> pd.Series:
+    """Parse MotionLogger timestamps.
+
+    The fixed dd/mm/yyyy HH:MM:SS layout is parsed by byte rearrangement
+    when the whole column conforms; otherwise pd.to_datetime takes over
+    (explicit format on the C fast path, cache=True to dedupe repeated
+    strings), with dayfirst inference as the last resort.
+    """
+    fixed = _parse_datetime_fixed(values.to_numpy())
+    if fixed is not None:
+        return pd.Series(fixed, index=values.index)
+    parsed = pd.to_datetime(values, format=DT_FORMAT, errors="coerce", cache=True)
+    if parsed.isna().all():
+        parsed = pd.to_datetime(values, dayfirst=True, errors="coerce")
+    return parsed
+
+
+def aggregate_chunk(
+    chunk: pd.DataFrame, agg: dict, state_col: str | None, t0: int, period_ns: int
+) -> pd.DataFrame:
+    """Aggregate one datetime-indexed chunk into per-bin partial sums.
+
+    Returns a DataFrame indexed by epoch bin id with raw sums per numeric
+    column, per-bin counts for MEAN columns (as "n::<col>"), and per-state
+    occurrence counts (as "s::<code>"). Partials from successive chunks
+    merge by plain addition, so the pipeline never holds more than one
+    chunk of raw rows in memory.
+    """
+    bin_id = (chunk.index.asi8 - t0) // period_ns
+
+    # MotionLogger writes rows in acquisition order, so bin ids are almost
+    # always already non-decreasing: verify that in one O(n) pass and derive
+    # the unique bins from run starts, paying np.unique's O(n log n) sort
+    # only when a file is actually out of order.
+    steps = np.diff(bin_id, prepend=bin_id[0] - 1)
+    if (steps >= 0).all():
+        starts = np.flatnonzero(steps)
+        uniq_bins = bin_id[starts]
+        run_lengths = np.diff(np.append(starts, bin_id.size))
+        bin_pos = np.repeat(np.arange(starts.size), run_lengths)
+    else:
+        starts = None
+        run_lengths = None
+        uniq_bins, bin_pos = np.unique(bin_id, return_inverse=True)
+    n_bins = uniq_bins.size
+
+    num_cols = [col for col in agg if np.issubdtype(chunk[col].dtype, np.number)]
+    # Unexpected non-numeric columns are skipped; they never reach the output.
+
+    # STATE as categorical codes (-1 for missing): states are a handful of
+    # distinct values, so factorize once and count codes into a dense
+    # (n_bins x n_states) matrix; the per-bin mode is a row-wise argmax
+    # later on. Codes shrink to one byte per row through the hot pass.
+    codes = None
+    state_values = None
+    n_states = 0
+    if state_col is not None:
+        codes, state_values = pd.factorize(chunk[state_col], use_na_sentinel=True)
+        n_states = len(state_values)
+        if 0 < n_states <= np.iinfo(np.int8).max:
+            codes = codes.astype(np.int8)
+
+    if _bin_scan_kernel is not None:
+        # Single JIT pass: per-bin sums, counts, and the state histogram are
+        # all accumulated in one walk over the rows.
+        if num_cols:
+            values = np.column_stack([chunk[c].to_numpy(dtype=np.float64) for c in num_cols])
+        else:
+            values = np.empty((len(chunk), 0), dtype=np.float64)
+        if codes is None:
+            codes = np.full(len(chunk), -1, dtype=np.int8)
+        sums, cnts, state_counts = _bin_scan_kernel(bin_pos, values, codes, n_bins, n_states)
+        data = {}
+        for j, col in enumerate(num_cols):
+            data[col] = sums[:, j]
+            if agg[col] == "mean":
+                data[f"n::{col}"] = cnts[:, j].astype(np.float64)
+    else:
+        # Numpy fallback: per-bin sums with one contiguous C pass per column.
+        # Time-ordered chunks (the normal case) use np.add.reduceat over the
+        # run starts, which has no per-group dispatch at all; out-of-order
+        # chunks fall back to np.bincount. NaNs are masked out per column to
+        # match pandas' skipna behavior.
+        data = {}
+        row_counts = None
+        for col in num_cols:
+            vals = chunk[col].to_numpy(dtype=np.float64)
+            nan_mask = np.isnan(vals)
+            if starts is not None:
+                if nan_mask.any():
+                    col_sum = np.add.reduceat(np.where(nan_mask, 0.0, vals), starts)
+                    cnt = np.add.reduceat((~nan_mask).astype(np.float64), starts)
+                else:
+                    col_sum = np.add.reduceat(vals, starts)
+                    cnt = run_lengths.astype(np.float64)
+            else:
+                if row_counts is None:
+                    row_counts = np.bincount(bin_pos, minlength=n_bins).astype(np.float64)
+                if nan_mask.any():
+                    pos = bin_pos[~nan_mask]
+                    weights = vals[~nan_mask]
+                    cnt = np.bincount(pos, minlength=n_bins).astype(np.float64)
+                else:
+                    pos, weights, cnt = bin_pos, vals, row_counts
+                col_sum = np.bincount(pos, weights=weights, minlength=n_bins)
+            data[col] = col_sum
+            if agg[col] == "mean":
+                data[f"n::{col}"] = cnt
+        state_counts = None
+        if n_states:
+            valid = codes >= 0
+            state_counts = np.zeros((n_bins, n_states), dtype=np.int32)
+            np.add.at(state_counts, (bin_pos[valid], codes[valid]), 1)
+
+    # Histogram columns are keyed by state value, so partials from chunks
+    # that saw different (or differently ordered) states merge correctly.
+    for k in range(n_states):
+        data[f"s::{state_values[k]}"] = state_counts[:, k].astype(np.float64)
+
+    return pd.DataFrame(data, index=uniq_bins)
+
+
+def format_float_col(arr: np.ndarray, max_decimals: int) -> np.ndarray:
+    """Format a float64 array with up to max_decimals, trimming trailing zeros/dot.
+
+    Whole-column replacement for the old scalar fmt_float_trim: every value is
+    formatted in a handful of C-level numpy passes instead of one Python call
+    (f-string + two rstrips) per element. NaN renders as "".
+    """
+    arr = np.asarray(arr, dtype=np.float64)
+    out = np.char.mod(f"%.{max_decimals}f", arr)
+    out = np.char.rstrip(np.char.rstrip(out, "0"), ".")
+    out = np.where((out == "-0") | (out == ""), "0", out)
+    out[np.isnan(arr)] = ""
+    return out
+
+
+def format_datetime_col(idx: pd.DatetimeIndex) -> np.ndarray:
+    """Render a DatetimeIndex as dd/mm/yyyy HH:MM:SS strings in bulk.
+
+    Composes the fixed-width layout from the vectorized component arrays
+    (.day, .month, ...) with np.char ops instead of Index.strftime, which
+    formats one element at a time through libc.
+    """
+
+    def pad(component: pd.Index, width: int) -> np.ndarray:
+        return np.char.zfill(component.to_numpy().astype(f"U{width}"), width)
+
+    parts = (
+        pad(idx.day, 2),
+        "/",
+        pad(idx.month, 2),
+        "/",
+        pad(idx.year, 4),
+        " ",
+        pad(idx.hour, 2),
+        ":",
+        pad(idx.minute, 2),
+        ":",
+        pad(idx.second, 2),
+    )
+    out = parts[0]
+    for part in parts[1:]:
+        out = np.char.add(out, part)
+    return out
+
+
+def find_data_header_line(in_path: Path) -> tuple[int, list[str]]:
+    """Locate the data table header line without reading the whole file.
+
+    Memory-maps the file and searches it as a zero-copy byte buffer, so
+    the OS only pages in what is actually touched. Returns the 0-based
+    line index of the header together with its column names.
+    """
+    not_found = ValueError(
+        "Could not find the data table header line starting with 'DATE/TIME;'."
+    )
+    prefix = ("DATE/TIME" + DELIM).encode("utf-8")
+    with open(in_path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped (and have no header).
+            raise not_found from None
+        with mapped as mm:
+            if mm[: len(prefix)] == prefix:
+                pos = 0
+            else:
+                hit = mm.find(b"\n" + prefix)
+                if hit < 0:
+                    raise not_found
+                pos = hit + 1
+            end = mm.find(b"\n", pos)
+            if end < 0:
+                end = len(mm)
+            header_cols = (
+                mm[pos:end].decode("utf-8", errors="replace").rstrip("\r").split(DELIM)
+            )
+            header_idx = mm[:pos].count(b"\n")
+            return header_idx, header_cols
+
+
+def build_output_path(in_path: Path, epoch_s: int) -> Path:
+    # Example: file.txt -> file_Condor_60s.txt
+    return in_path.with_name(f"{in_path.stem}_Condor_{epoch_s}s{in_path.suffix}")
+
+
+class NoDataError(ValueError):
+    """Raised when the input file yields no usable data rows."""
+
+
+def convert(in_path: Path, epoch_seconds: int) -> Path:
+    """Convert a MotionLogger export into a Condor file with epoch_seconds epochs.
+
+    Writes the result next to the input (see build_output_path) and returns
+    its path. Raises ValueError when the file cannot be parsed and
+    NoDataError when it parses but contains no usable rows.
+    """
+    out_path = build_output_path(in_path, epoch_seconds)
+
+    # --- Locate the data table header (columns preserved in file order) ---
+    header_idx, header_cols = find_data_header_line(in_path)
+
+    if not header_cols or header_cols[0] != DATETIME_COL:
+        raise ValueError("Unexpected table header format.")
+
+    # --- Build aggregation rules ---
+    # IMPORTANT: We ignore original ZCMn/PIMn entirely and compute them from aggregated values later.
+    # Default behavior:
+    # - EVENT, PIM, ZCM -> SUM across the window
+    # - EXT TEMPERATURE, LIGHT -> MEAN
+    # - STATE -> MODE
+    agg = {}
+    state_col = None
+    for col in header_cols[1:]:
+        cu = str(col).upper()
+        if cu in {"ZCMN", "PIMN"}:
+            continue  # ignore original ZCMn input entirely
+        if cu == "STATE":
+            state_col = col  # mode is computed separately below
+        elif cu in {"EXT TEMPERATURE", "LIGHT"}:
+            agg[col] = "mean"
+        else:
+            agg[col] = "sum"
+
+    # --- Stream the file through the parser chunk by chunk ---
+    # The C engine is much faster than the Python one, and declaring dtypes
+    # up front avoids a second conversion pass over every column. Reading in
+    # chunks keeps peak memory at O(one chunk + occupied epochs) instead of
+    # O(rows): each chunk is parsed, binned on (ts - t0) // epoch, and
+    # reduced to per-bin partial sums that merge by addition at the end.
+    # Binning on explicit epoch ids (rather than resample) also means a
+    # stray timestamp far from the rest never materializes empty epochs.
+    dtype_map = {col: NUMERIC_DTYPES.get(str(col).upper(), str) for col in header_cols}
+
+    period_ns = epoch_seconds * 1_000_000_000
+    t0 = None
+    partials = []
+    for chunk in iter_data_chunks(in_path, header_idx, dtype_map):
+        chunk[DATETIME_COL] = parse_datetime_col(chunk[DATETIME_COL])
+        chunk = chunk.dropna(subset=[DATETIME_COL]).set_index(DATETIME_COL)
+        if chunk.empty:
+            continue
+        if t0 is None:
+            # Epochs are anchored at the earliest sample of the first
+            # chunk; MotionLogger writes rows in acquisition order, so
+            # this is the overall collection start.
+            t0 = int(chunk.index.asi8.min())
+        partials.append(aggregate_chunk(chunk, agg, state_col, t0, period_ns))
+
+    if t0 is None:
+        raise NoDataError("No data rows were found after parsing.")
+
+    merged = partials[0] if len(partials) == 1 else pd.concat(partials).groupby(level=0).sum()
+    merged = merged.sort_index()
+
+    # --- Finalize per-epoch aggregates from the merged partials ---
+    uniq_bins = merged.index.to_numpy()
+    n_bins = uniq_bins.size
+
+    data = {}
+    for col, how in agg.items():
+        if col not in merged.columns:
+            continue
+        if how == "mean":
+            cnt = merged[f"n::{col}"].to_numpy()
+            data[col] = np.divide(
+                merged[col].to_numpy(), cnt, out=np.full(n_bins, np.nan), where=cnt > 0
+            )
+        else:
+            data[col] = merged[col].to_numpy()
+    df_res = pd.DataFrame(data, index=uniq_bins)
+
+    # STATE mode: argmax over the merged per-state counts; ties resolve to
+    # the smallest value, same as Series.mode(). Bins with no usable state
+    # stay blank.
+    if state_col is not None:
+        state_count_cols = [c for c in merged.columns if str(c).startswith("s::")]
+        mode = np.full(n_bins, np.nan)
+        if state_count_cols:
+            state_values = np.array([float(str(c)[3:]) for c in state_count_cols])
+            order = np.argsort(state_values)
+            state_values = state_values[order]
+            counts = merged[state_count_cols].to_numpy()[:, order]
+            occupied = counts.sum(axis=1) > 0
+            mode = np.where(occupied, state_values[counts.argmax(axis=1)], np.nan)
+        df_res[state_col] = mode
+
+    df_res.index = pd.to_datetime(t0 + df_res.index.to_numpy() * period_ns)
+
+    # --- Compute NEW PIMn/ZCMn from aggregated values / epoch_length_seconds ---
+    # np.nan (not pd.NA) so the columns stay float64 for the formatter.
+    if "PIM" in df_res.columns:
+        df_res["PIMn"] = df_res["PIM"] / float(epoch_seconds)
+    else:
+        df_res["PIMn"] = np.nan
+
+    if "ZCM" in df_res.columns:
+        df_res["ZCMn"] = df_res["ZCM"] / float(epoch_seconds)
+    else:
+        df_res["ZCMn"] = np.nan
+
+    # --- Build output rows, preserving Condor header/order ---
+    # Format column-by-column with vectorized numpy ops; nothing below
+    # touches the frame row-by-row.
+    dt_str = format_datetime_col(df_res.index)
+
+    formatted = {DATETIME_COL: dt_str}
+    for col in OUTPUT_COLUMNS[1:]:
+        # Blank if the column is missing entirely. Aggregation always yields
+        # float64, so the values need no re-coercion before formatting.
+        if col in df_res.columns:
+            vals = df_res[col].to_numpy()
+        else:
+            vals = np.full(len(df_res), np.nan)
+        decimals = COLUMN_DECIMALS.get(col.upper(), 6)
+        if decimals is None:
+            out = np.char.mod("%d", np.nan_to_num(np.rint(vals)).astype(np.int64))
+            out[np.isnan(vals)] = ""
+            formatted[col] = out
+        else:
+            formatted[col] = format_float_col(vals, decimals)
+
+    # The body is written by to_csv below; every cell is already a fully
+    # formatted string, so the writer does no quoting or conversion. Plain
+    # arrays (not Series) keep this stage free of index bookkeeping.
+    out_df = pd.DataFrame(formatted)[OUTPUT_COLUMNS]
+
+    # --- Write output in Condor format (header updated, 1 line per epoch) ---
+    created_at = datetime.now().strftime(DT_FORMAT)
+    # The epoch index is sorted by construction, so first/last are the ends.
+    first_epoch = df_res.index[0].strftime(DT_FORMAT)
+    last_epoch = df_res.index[-1].strftime(DT_FORMAT)
+
+    out_lines = []
+    out_lines.extend(
+        [
+            "+-------------+ MotionLogger Conversion to Condor Report +-------------+",
+            f"SUBJECT_NAME : {in_path.stem}",
+            "SUBJECT_DESCRIPTION :",
+            "DEVICE_ID : Micro MotionLogger",
+            f"FILE_DATE_TIME : {created_at}",
+            f"Collection_Start: {first_epoch}",
+            f"Collection_End: {last_epoch}",
+            f"Epoch_Duration:  {epoch_seconds}",
+            "+----------------------------------------------------------------------+",
+        ]
+    )
+    out_lines.append(DELIM.join(OUTPUT_COLUMNS))
+
+    # Stream to disk through a large buffer rather than assembling the whole
+    # file as one string first; chunksize keeps to_csv's intermediate
+    # buffers small.
+    with open(out_path, "w", encoding="utf-8", buffering=1 << 20, newline="\n") as f:
+        f.write("\n".join(out_lines) + "\n")
+        out_df.to_csv(
+            f, sep=DELIM, header=False, index=False, lineterminator="\n", chunksize=65_536
+        )
+
+    return out_path